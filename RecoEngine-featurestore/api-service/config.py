@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     DEFAULT_TRAINING_SAMPLES: int = 5000
     DEFAULT_TEST_SIZE: float = 0.2
     RANDOM_STATE: int = 42
+    TRAINING_DATA_PARQUET_PATH: str = ""  # When set and present, training reads this file instead of scanning Aerospike
     
     # LLM Configuration
     GEMINI_API_KEY: str = ""  # Set via environment variable or .env file
@@ -10,8 +10,10 @@ import aerospike
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import uuid
+import os
+import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from feature_config import (
     FEATURE_COLUMNS, CATEGORICAL_MAPPINGS, CATEGORICAL_INDICES, SYNTHETIC_DATA_PARAMS
 )
@@ -20,6 +22,10 @@ from config import settings
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Sample counts at or above this are drawn across threads with spawned generators
+PARALLEL_SAMPLING_THRESHOLD = 1_000_000
+SAMPLING_THREADS = 8
+
 class TrainingDataGenerator:
     def __init__(self, aerospike_host="localhost", aerospike_port=3000):
         self.aerospike_host = aerospike_host
@@ -55,78 +61,44 @@ class TrainingDataGenerator:
         """Generate synthetic training features"""
         logger.info(f"Generating {n_samples} synthetic training samples")
         
-        np.random.seed(random_seed)
+        seed_sequence = np.random.SeedSequence(random_seed)
+        
+        if n_samples >= PARALLEL_SAMPLING_THRESHOLD:
+            # Each thread draws its share with an independent child generator;
+            # numpy releases the GIL inside the sampling loops
+            chunk_sizes = [len(chunk) for chunk in np.array_split(np.arange(n_samples), SAMPLING_THREADS)]
+            rngs = [np.random.default_rng(s) for s in seed_sequence.spawn(SAMPLING_THREADS)]
+            with ThreadPoolExecutor(max_workers=SAMPLING_THREADS) as executor:
+                chunks = list(executor.map(self._draw_feature_columns, rngs, chunk_sizes))
+            columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+            label_rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        else:
+            label_rng = np.random.default_rng(seed_sequence)
+            columns = self._draw_feature_columns(label_rng, n_samples)
+        
+        # Generate churn labels based on realistic patterns
+        churn_probabilities = self._calculate_churn_probability(columns)
+        churn_labels = (label_rng.random(n_samples) < churn_probabilities).astype(int)
+        
+        # Every sample in the batch shares one generation timestamp
+        generated_at = datetime.utcnow().isoformat()
+        
+        # Draw 4 random bytes (8 hex chars) per user ID with a single urandom call
+        id_hex = os.urandom(4 * n_samples).hex()
         
         training_data = []
         
         for i in range(n_samples):
             # Generate base user ID
-            user_id = f"synthetic_user_{uuid.uuid4().hex[:8]}"
-            
-            # Generate realistic feature values
-            features = {}
-            
-            # Account and membership features
-            features['acc_age_days'] = np.random.exponential(365) + 30  # 30+ days, exponential distribution
-            features['member_dur'] = features['acc_age_days'] * np.random.uniform(0.5, 1.0)  # Member duration <= account age
-            
-            # Categorical features (encoded)
-            features['loyalty_enc'] = np.random.choice([1, 2, 3, 4], p=[0.4, 0.3, 0.2, 0.1])  # Bronze most common
-            features['geo_loc_enc'] = np.random.choice([1, 2, 3, 4, 5], p=[0.3, 0.25, 0.2, 0.15, 0.1])
-            features['device_type_enc'] = np.random.choice([1, 2, 3], p=[0.6, 0.3, 0.1])  # Mobile most common
-            features['pref_pay_enc'] = np.random.choice([1, 2, 3, 4], p=[0.5, 0.3, 0.15, 0.05])
-            features['lang_pref_enc'] = np.random.choice([1, 2, 3, 4], p=[0.7, 0.15, 0.1, 0.05])
-            features['sub_pay_enc'] = np.random.choice([1, 2, 3], p=[0.7, 0.2, 0.1])
-            features['retention_enc'] = np.random.choice([1, 2, 3], p=[0.4, 0.3, 0.3])
+            user_id = f"synthetic_user_{id_hex[i * 8:(i + 1) * 8]}"
             
-            # Activity features
-            features['days_last_login'] = np.random.exponential(5)  # Most users login frequently
-            features['days_last_purch'] = np.random.exponential(15) + features['days_last_login']  # Purchase after login
-            features['sess_7d'] = max(0, np.random.poisson(5))  # Sessions in last 7 days
-            features['sess_30d'] = features['sess_7d'] + max(0, np.random.poisson(15))  # Sessions in last 30 days
-            features['avg_sess_dur'] = np.random.lognormal(3, 0.5)  # Average session duration in minutes
-            
-            # Engagement features
-            features['ctr_10_sess'] = np.random.beta(2, 8)  # Click-through rate (0-1)
-            features['cart_abandon'] = np.random.beta(3, 7)  # Cart abandonment rate (0-1)
-            features['wishlist_ratio'] = np.random.beta(2, 8)  # Wishlist to purchase ratio
-            features['content_engage'] = np.random.beta(3, 7)  # Content engagement score
-            
-            # Purchase behavior features
-            features['avg_order_val'] = np.random.lognormal(4, 0.8) + 10  # Average order value
-            features['orders_6m'] = max(0, np.random.poisson(3))  # Orders in last 6 months
-            features['purch_freq_90d'] = max(0, np.random.poisson(2))  # Purchase frequency in 90 days
-            features['last_hv_purch'] = features['days_last_purch'] + np.random.exponential(30)  # Days since last high-value purchase
-            features['refund_rate'] = np.random.beta(1, 9)  # Refund rate (0-1)
-            
-            # Marketing features
-            features['discount_dep'] = np.random.beta(2, 5)  # Discount dependency
-            features['push_open_rate'] = np.random.beta(3, 7)  # Push notification open rate
-            features['email_ctr'] = np.random.beta(2, 8)  # Email click-through rate
-            features['inapp_ctr'] = np.random.beta(3, 7)  # In-app click-through rate
-            features['promo_resp_time'] = np.random.exponential(24)  # Promo response time in hours
-            
-            # Support features
-            features['tickets_90d'] = max(0, np.random.poisson(1))  # Support tickets in 90 days
-            features['avg_ticket_res'] = np.random.exponential(48) + 2  # Average ticket resolution time in hours
-            features['csat_score'] = np.random.choice([1, 2, 3, 4, 5], p=[0.05, 0.1, 0.2, 0.4, 0.25])  # Customer satisfaction
-            features['refund_req'] = max(0, np.random.poisson(0.5))  # Number of refund requests
-            
-            # Session behavior features
-            features['curr_sess_clk'] = max(0, np.random.poisson(10))  # Clicks in current session
-            features['checkout_time'] = np.random.exponential(300) + 60  # Checkout time in seconds
-            features['cart_no_buy'] = max(0, np.random.poisson(2))  # Cart additions without purchase
-            features['bounce_flag'] = np.random.choice([0, 1], p=[0.7, 0.3])  # Bounce flag
-            
-            # Generate churn label based on realistic patterns
-            churn_probability = self._calculate_churn_probability(features)
-            churn_label = 1 if np.random.random() < churn_probability else 0
+            features = {name: values[i] for name, values in columns.items()}
             
             # Add metadata
             sample = {
                 'user_id': user_id,
-                'churn_label': churn_label,  # Changed from 'churn' to 'churn_label' to match training service
-                'generated_at': datetime.utcnow().isoformat(),
+                'churn_label': int(churn_labels[i]),  # Changed from 'churn' to 'churn_label' to match training service
+                'generated_at': generated_at,
                 'data_source': 'synthetic',
                 **features
             }
@@ -140,81 +112,107 @@ class TrainingDataGenerator:
         logger.info(f"Generated {len(training_data)} training samples")
         return training_data
     
+    def _draw_feature_columns(self, rng, n):
+        """Draw n realistic values for every feature as column arrays"""
+        features = {}
+        
+        # Account and membership features
+        features['acc_age_days'] = rng.exponential(365, n) + 30  # 30+ days, exponential distribution
+        features['member_dur'] = features['acc_age_days'] * rng.uniform(0.5, 1.0, n)  # Member duration <= account age
+        
+        # Categorical features (encoded)
+        features['loyalty_enc'] = rng.choice([1, 2, 3, 4], size=n, p=[0.4, 0.3, 0.2, 0.1])  # Bronze most common
+        features['geo_loc_enc'] = rng.choice([1, 2, 3, 4, 5], size=n, p=[0.3, 0.25, 0.2, 0.15, 0.1])
+        features['device_type_enc'] = rng.choice([1, 2, 3], size=n, p=[0.6, 0.3, 0.1])  # Mobile most common
+        features['pref_pay_enc'] = rng.choice([1, 2, 3, 4], size=n, p=[0.5, 0.3, 0.15, 0.05])
+        features['lang_pref_enc'] = rng.choice([1, 2, 3, 4], size=n, p=[0.7, 0.15, 0.1, 0.05])
+        features['sub_pay_enc'] = rng.choice([1, 2, 3], size=n, p=[0.7, 0.2, 0.1])
+        features['retention_enc'] = rng.choice([1, 2, 3], size=n, p=[0.4, 0.3, 0.3])
+        
+        # Activity features
+        features['days_last_login'] = rng.exponential(5, n)  # Most users login frequently
+        features['days_last_purch'] = rng.exponential(15, n) + features['days_last_login']  # Purchase after login
+        features['sess_7d'] = rng.poisson(5, n)  # Sessions in last 7 days
+        features['sess_30d'] = features['sess_7d'] + rng.poisson(15, n)  # Sessions in last 30 days
+        features['avg_sess_dur'] = rng.lognormal(3, 0.5, n)  # Average session duration in minutes
+        
+        # Engagement features
+        features['ctr_10_sess'] = rng.beta(2, 8, n)  # Click-through rate (0-1)
+        features['cart_abandon'] = rng.beta(3, 7, n)  # Cart abandonment rate (0-1)
+        features['wishlist_ratio'] = rng.beta(2, 8, n)  # Wishlist to purchase ratio
+        features['content_engage'] = rng.beta(3, 7, n)  # Content engagement score
+        
+        # Purchase behavior features
+        features['avg_order_val'] = rng.lognormal(4, 0.8, n) + 10  # Average order value
+        features['orders_6m'] = rng.poisson(3, n)  # Orders in last 6 months
+        features['purch_freq_90d'] = rng.poisson(2, n)  # Purchase frequency in 90 days
+        features['last_hv_purch'] = features['days_last_purch'] + rng.exponential(30, n)  # Days since last high-value purchase
+        features['refund_rate'] = rng.beta(1, 9, n)  # Refund rate (0-1)
+        
+        # Marketing features
+        features['discount_dep'] = rng.beta(2, 5, n)  # Discount dependency
+        features['push_open_rate'] = rng.beta(3, 7, n)  # Push notification open rate
+        features['email_ctr'] = rng.beta(2, 8, n)  # Email click-through rate
+        features['inapp_ctr'] = rng.beta(3, 7, n)  # In-app click-through rate
+        features['promo_resp_time'] = rng.exponential(24, n)  # Promo response time in hours
+        
+        # Support features
+        features['tickets_90d'] = rng.poisson(1, n)  # Support tickets in 90 days
+        features['avg_ticket_res'] = rng.exponential(48, n) + 2  # Average ticket resolution time in hours
+        features['csat_score'] = rng.choice([1, 2, 3, 4, 5], size=n, p=[0.05, 0.1, 0.2, 0.4, 0.25])  # Customer satisfaction
+        features['refund_req'] = rng.poisson(0.5, n)  # Number of refund requests
+        
+        # Session behavior features
+        features['curr_sess_clk'] = rng.poisson(10, n)  # Clicks in current session
+        features['checkout_time'] = rng.exponential(300, n) + 60  # Checkout time in seconds
+        features['cart_no_buy'] = rng.poisson(2, n)  # Cart additions without purchase
+        features['bounce_flag'] = rng.choice([0, 1], size=n, p=[0.7, 0.3])  # Bounce flag
+        
+        return features
+    
     def _calculate_churn_probability(self, features):
-        """Calculate churn probability based on feature values using realistic correlations"""
-        churn_score = 0.0
+        """Calculate churn probabilities for feature columns using realistic correlations
+        
+        Each tiered rule is written as a sum of step masks (e.g. ``0.15*(x > 7) +
+        0.15*(x > 14)`` for "+0.15 above 7, +0.3 above 14") so the whole score is
+        computed branch-free over the arrays.
+        """
+        days_last_login = features['days_last_login']
+        days_last_purch = features['days_last_purch']
+        cart_abandon = features['cart_abandon']
+        sess_7d = features['sess_7d']
+        csat_score = features['csat_score']
+        refund_rate = features['refund_rate']
+        tickets_90d = features['tickets_90d']
+        orders_6m = features['orders_6m']
+        loyalty_enc = features['loyalty_enc']
+        avg_order_val = features['avg_order_val']
+        push_open_rate = features['push_open_rate']
         
         # High-risk factors (increase churn probability)
-        if features.get('days_last_login', 0) > 14:
-            churn_score += 0.3
-        elif features.get('days_last_login', 0) > 7:
-            churn_score += 0.15
-            
-        if features.get('days_last_purch', 0) > 60:
-            churn_score += 0.25
-        elif features.get('days_last_purch', 0) > 30:
-            churn_score += 0.1
-            
-        if features.get('cart_abandon', 0) > 0.7:
-            churn_score += 0.2
-        elif features.get('cart_abandon', 0) > 0.5:
-            churn_score += 0.1
-            
-        if features.get('sess_7d', 0) < 2:
-            churn_score += 0.2
-        elif features.get('sess_7d', 0) < 5:
-            churn_score += 0.1
-            
-        if features.get('csat_score', 5) < 3:
-            churn_score += 0.15
-        elif features.get('csat_score', 5) < 4:
-            churn_score += 0.05
-            
-        if features.get('refund_rate', 0) > 0.3:
-            churn_score += 0.15
-        elif features.get('refund_rate', 0) > 0.1:
-            churn_score += 0.05
-            
-        if features.get('tickets_90d', 0) > 3:
-            churn_score += 0.1
-        elif features.get('tickets_90d', 0) > 1:
-            churn_score += 0.05
-            
-        if features.get('orders_6m', 0) == 0:
-            churn_score += 0.3
-        elif features.get('orders_6m', 0) < 2:
-            churn_score += 0.15
-            
+        churn_score = (
+            0.15 * (days_last_login > 7) + 0.15 * (days_last_login > 14)
+            + 0.1 * (days_last_purch > 30) + 0.15 * (days_last_purch > 60)
+            + 0.1 * (cart_abandon > 0.5) + 0.1 * (cart_abandon > 0.7)
+            + 0.1 * (sess_7d < 5) + 0.1 * (sess_7d < 2)
+            + 0.05 * (csat_score < 4) + 0.1 * (csat_score < 3)
+            + 0.05 * (refund_rate > 0.1) + 0.1 * (refund_rate > 0.3)
+            + 0.05 * (tickets_90d > 1) + 0.05 * (tickets_90d > 3)
+            + 0.15 * (orders_6m < 2) + 0.15 * (orders_6m == 0)
+        )
+        
         # Protective factors (decrease churn probability)
-        if features.get('loyalty_enc', 1) >= 3:  # Gold/Platinum
-            churn_score -= 0.2
-        elif features.get('loyalty_enc', 1) >= 2:  # Silver
-            churn_score -= 0.1
-            
-        if features.get('orders_6m', 0) > 10:
-            churn_score -= 0.15
-        elif features.get('orders_6m', 0) > 5:
-            churn_score -= 0.1
-            
-        if features.get('avg_order_val', 0) > 100:
-            churn_score -= 0.1
-        elif features.get('avg_order_val', 0) > 50:
-            churn_score -= 0.05
-            
-        if features.get('push_open_rate', 0) > 0.5:
-            churn_score -= 0.1
-        elif features.get('push_open_rate', 0) > 0.3:
-            churn_score -= 0.05
-            
-        if features.get('email_ctr', 0) > 0.3:
-            churn_score -= 0.05
-            
-        if features.get('avg_sess_dur', 0) > 20:
-            churn_score -= 0.05
+        churn_score -= (
+            0.1 * (loyalty_enc >= 2) + 0.1 * (loyalty_enc >= 3)  # Silver, Gold/Platinum
+            + 0.1 * (orders_6m > 5) + 0.05 * (orders_6m > 10)
+            + 0.05 * (avg_order_val > 50) + 0.05 * (avg_order_val > 100)
+            + 0.05 * (push_open_rate > 0.3) + 0.05 * (push_open_rate > 0.5)
+            + 0.05 * (features['email_ctr'] > 0.3)
+            + 0.05 * (features['avg_sess_dur'] > 20)
+        )
         
         # Convert to probability and ensure realistic range
-        churn_probability = max(0.05, min(0.95, 0.25 + churn_score))  # Base rate of 25% ± adjustments
-        return churn_probability
+        return np.clip(0.25 + churn_score, 0.05, 0.95)  # Base rate of 25% ± adjustments
     
     def store_training_data(self, training_data, clear_existing=False):
         """Store training data in Aerospike"""
@@ -265,6 +263,16 @@ class TrainingDataGenerator:
     
     def _clear_training_data(self):
         """Clear existing training data from Aerospike"""
+        try:
+            before_count = self.get_training_data_count()
+            # Truncate marks the whole set empty server-side in one request
+            self.client.truncate(self.namespace, self.set_name, 0)
+            logger.info(f"Truncated training data set ({before_count} records before, "
+                        f"{self.get_training_data_count()} after)")
+            return
+        except Exception as e:
+            logger.warning(f"Truncate failed, falling back to scan and delete: {e}")
+        
         try:
             # Scan and delete all records in the training_data set
             scan = self.client.scan(self.namespace, self.set_name)
@@ -288,12 +296,24 @@ class TrainingDataGenerator:
             logger.error(f"Error clearing training data: {e}")
             # Don't raise exception here, as this is optional cleanup
     
+    def save_training_data_parquet(self, training_data, parquet_path):
+        """Write training data to a zstd-compressed Parquet file"""
+        df = pd.DataFrame.from_records(training_data)
+        df.to_parquet(parquet_path, compression='zstd', engine='pyarrow', index=False)
+        logger.info(f"Wrote {len(df)} training samples to {parquet_path}")
+        return len(df)
+    
     def get_training_data_count(self):
         """Get count of training data records"""
         if not self.client:
             if not self.connect_aerospike():
                 return 0
         
+        try:
+            return self._get_set_object_count()
+        except Exception as e:
+            logger.warning(f"Info-based count failed, falling back to scan: {e}")
+        
         try:
             scan = self.client.scan(self.namespace, self.set_name)
             count = 0
@@ -309,26 +329,54 @@ class TrainingDataGenerator:
             logger.error(f"Error counting training data: {e}")
             return 0
     
-    def generate_and_store(self, n_samples=1000, clear_existing=False, random_seed=42):
+    def _get_set_object_count(self):
+        """Read the set's object count from node metadata via the info protocol"""
+        replies = self.client.info_all(f"sets/{self.namespace}/{self.set_name}")
+        
+        total_objects = 0
+        for node, (error, response) in replies.items():
+            if error:
+                raise Exception(f"Info request failed on node {node}: {error}")
+            match = re.search(r"objects=(\d+)", response or "")
+            if match:
+                total_objects += int(match.group(1))
+        
+        # Per-node counts include replica copies, so divide them back out
+        replication_factor = 1
+        ns_replies = self.client.info_all(f"namespace/{self.namespace}")
+        for error, response in ns_replies.values():
+            match = re.search(r"effective_replication_factor=(\d+)", response or "")
+            if not error and match:
+                replication_factor = max(1, int(match.group(1)))
+                break
+        
+        return total_objects // replication_factor
+    
+    def generate_and_store(self, n_samples=1000, clear_existing=False, random_seed=42,
+                           parquet_path=None, store_in_aerospike=True):
         """Generate and store training data in one operation"""
         logger.info(f"Starting training data generation and storage process")
         
         # Generate synthetic data
         training_data = self.generate_synthetic_features(n_samples, random_seed)
         
-        # Store in Aerospike
-        stored_count = self.store_training_data(training_data, clear_existing)
-        
-        # Get final count
-        total_count = self.get_training_data_count()
-        
         result = {
             'generated_samples': len(training_data),
-            'stored_samples': stored_count,
-            'total_training_samples': total_count,
             'timestamp': datetime.utcnow().isoformat()
         }
         
+        # Training-only workflows can skip the Aerospike round trip entirely
+        if parquet_path:
+            result['parquet_samples'] = self.save_training_data_parquet(training_data, parquet_path)
+            result['parquet_path'] = parquet_path
+        
+        if store_in_aerospike:
+            # Store in Aerospike
+            result['stored_samples'] = self.store_training_data(training_data, clear_existing)
+            
+            # Get final count
+            result['total_training_samples'] = self.get_training_data_count()
+        
         logger.info(f"Training data generation complete: {result}")
         return result
 
@@ -343,8 +391,12 @@ if __name__ == "__main__":
     parser.add_argument('--port', type=int, default=3000, help='Aerospike port')
     parser.add_argument('--clear', action='store_true', help='Clear existing training data')
     parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducibility')
+    parser.add_argument('--parquet-out', type=str, default=None, help='Also write the samples to this Parquet file')
+    parser.add_argument('--parquet-only', action='store_true', help='Write Parquet only and skip Aerospike')
     
     args = parser.parse_args()
+    if args.parquet_only and not args.parquet_out:
+        parser.error('--parquet-only requires --parquet-out')
     
     # Create generator and run
     generator = TrainingDataGenerator(args.host, args.port)
@@ -352,7 +404,9 @@ if __name__ == "__main__":
         result = generator.generate_and_store(
             n_samples=args.samples,
             clear_existing=args.clear,
-            random_seed=args.seed
+            random_seed=args.seed,
+            parquet_path=args.parquet_out,
+            store_in_aerospike=not args.parquet_only
         )
         print(f"Success: {result}")
     finally:
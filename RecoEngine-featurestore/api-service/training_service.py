@@ -13,8 +13,9 @@ import joblib
 import os
 import uuid
 import aerospike
+import pyarrow.parquet as pq
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, classification_report, confusion_matrix
+from sklearn.metrics import roc_auc_score, confusion_matrix
 import json
 from feature_config import FEATURE_COLUMNS, MODEL_PARAMS
 from config import settings
@@ -22,24 +23,40 @@ from config import settings
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Boosting rounds without validation-loss improvement before training stops
+EARLY_STOPPING_ROUNDS = 20
+
+# Fraction of the training split held out as the early-stopping validation set
+VALIDATION_SIZE = 0.1
+
 class ModelTrainer:
     def __init__(self, aerospike_client):
         self.client = aerospike_client
         self.namespace = settings.AEROSPIKE_NAMESPACE
         self.set_name = "training_data"
         self.feature_columns = FEATURE_COLUMNS
+        self.parquet_path = settings.TRAINING_DATA_PARQUET_PATH
         self.model = None
         self.training_metrics = {}
         
-    def load_training_data(self) -> Tuple[pd.DataFrame, np.ndarray]:
-        """Load training data from Aerospike"""
+    def load_training_data(self, parquet_path: Optional[str] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Load training data from a Parquet file if one is available, otherwise from Aerospike"""
+        parquet_path = parquet_path or self.parquet_path
+        if parquet_path and os.path.exists(parquet_path):
+            return self._load_training_data_parquet(parquet_path)
+        
         logger.info("Loading training data from Aerospike...")
         
         try:
-            # Scan the training data set
+            # Scan the training data set, projecting only the bins used for training
             scan = self.client.scan(self.namespace, self.set_name)
+            scan.select(*self.feature_columns, 'churn_label', 'user_id')
             
-            training_records = []
+            # Accumulate column lists directly so the DataFrame skips per-row schema inference
+            columns = {name: [] for name in ('user_id', 'churn_label', *self.feature_columns)}
+            feature_appenders = [(name, columns[name].append) for name in self.feature_columns]
+            append_user_id = columns['user_id'].append
+            append_churn_label = columns['churn_label'].append
             total_records = 0
             
             for record in scan.results():
@@ -47,27 +64,19 @@ class ModelTrainer:
                 record_data = record[2]  # The actual data is in index 2
                 
                 # Extract features and label
-                features = {}
-                for feature_name in self.feature_columns:
-                    features[feature_name] = record_data.get(feature_name, 0.0)
+                for feature_name, append_feature in feature_appenders:
+                    append_feature(record_data.get(feature_name, 0.0))
                 
-                churn_label = record_data.get('churn_label', 0)
-                user_id = record_data.get('user_id', f'unknown_{total_records}')
-                
-                training_record = {
-                    'user_id': user_id,
-                    'churn_label': churn_label,
-                    **features
-                }
-                training_records.append(training_record)
+                append_churn_label(record_data.get('churn_label', 0))
+                append_user_id(record_data.get('user_id', f'unknown_{total_records}'))
             
-            logger.info(f"Loaded {len(training_records)} training records from Aerospike")
+            logger.info(f"Loaded {total_records} training records from Aerospike")
             
-            if len(training_records) == 0:
+            if total_records == 0:
                 raise ValueError("No training data found in Aerospike")
             
             # Convert to DataFrame
-            df = pd.DataFrame(training_records)
+            df = pd.DataFrame(columns)
             
             # Separate features and labels
             X = df[self.feature_columns].values
@@ -82,6 +91,30 @@ class ModelTrainer:
             logger.error(f"Failed to load training data: {e}")
             raise
     
+    def _load_training_data_parquet(self, parquet_path: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Load training data from a Parquet file written by the training data generator"""
+        logger.info(f"Loading training data from Parquet file: {parquet_path}")
+        
+        try:
+            columns = self.feature_columns + ['churn_label', 'user_id']
+            df = pq.read_table(parquet_path, columns=columns).to_pandas()
+            
+            if len(df) == 0:
+                raise ValueError(f"No training data found in {parquet_path}")
+            
+            # Separate features and labels
+            X = df[self.feature_columns].values
+            y = df['churn_label'].values
+            
+            logger.info(f"Training data shape: X={X.shape}, y={y.shape}")
+            logger.info(f"Churn distribution: {np.bincount(y)} (0=no churn, 1=churn)")
+            
+            return df, X, y
+            
+        except Exception as e:
+            logger.error(f"Failed to load training data from Parquet: {e}")
+            raise
+    
     def train_model(self, X: np.ndarray, y: np.ndarray, test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
         """Train the XGBoost model"""
         logger.info("Starting model training...")
@@ -92,40 +125,65 @@ class ModelTrainer:
                 X, y, test_size=test_size, random_state=random_state, stratify=y
             )
             
-            logger.info(f"Training set: {X_train.shape}, Test set: {X_test.shape}")
+            training_samples = len(X_train)
+            
+            # Hold a validation set out of the training split for early stopping, so the
+            # test set is never used to pick the model and its metrics stay unbiased
+            X_train, X_val, y_train, y_val = train_test_split(
+                X_train, y_train, test_size=VALIDATION_SIZE, random_state=random_state, stratify=y_train
+            )
             
-            # Initialize and train the model
-            self.model = xgb.XGBClassifier(**MODEL_PARAMS)
+            logger.info(f"Training set: {X_train.shape}, Validation set: {X_val.shape}, Test set: {X_test.shape}")
+            
+            # Find the best round count, stopping once the validation loss stops improving
+            early_stopping_model = xgb.XGBClassifier(**MODEL_PARAMS, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
             
             # Train the model
             training_start = datetime.utcnow()
-            self.model.fit(X_train, y_train)
+            early_stopping_model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+            best_iteration = int(early_stopping_model.best_iteration)
+            
+            # Refit with exactly the best number of trees, so the saved model ends at the best
+            # iteration and SHAP explains the same trees that produce the churn probability
+            self.model = xgb.XGBClassifier(**{**MODEL_PARAMS, 'n_estimators': best_iteration + 1})
+            self.model.fit(X_train, y_train, verbose=False)
             training_end = datetime.utcnow()
             training_duration = (training_end - training_start).total_seconds()
             
-            logger.info(f"Model training completed in {training_duration:.2f} seconds")
+            logger.info(f"Model training completed in {training_duration:.2f} seconds "
+                        f"(best iteration: {best_iteration})")
             
-            # Make predictions
-            y_train_pred = self.model.predict(X_train)
-            y_test_pred = self.model.predict(X_test)
-            y_test_proba = self.model.predict_proba(X_test)[:, 1]
+            # Make predictions on DMatrix objects built once, instead of letting each
+            # predict/predict_proba call rebuild one from the numpy arrays
+            booster = self.model.get_booster()
+            dtrain = xgb.DMatrix(X_train)
+            dtest = xgb.DMatrix(X_test)
+            y_train_pred = (booster.predict(dtrain) > 0.5).astype(int)
+            y_test_proba = booster.predict(dtest)
+            y_test_pred = (y_test_proba > 0.5).astype(int)
+            
+            # Calculate metrics; everything except ROC AUC derives from one confusion matrix
+            cm = confusion_matrix(y_test, y_test_pred, labels=[0, 1])
+            report = self._classification_report_from_confusion(cm)
             
-            # Calculate metrics
             metrics = {
                 'training_duration_seconds': training_duration,
-                'training_samples': len(X_train),
+                'training_samples': training_samples,
+                'validation_samples': len(X_val),
                 'test_samples': len(X_test),
                 'feature_count': len(self.feature_columns),
-                'train_accuracy': float(accuracy_score(y_train, y_train_pred)),
-                'test_accuracy': float(accuracy_score(y_test, y_test_pred)),
-                'test_precision': float(precision_score(y_test, y_test_pred, zero_division=0)),
-                'test_recall': float(recall_score(y_test, y_test_pred, zero_division=0)),
-                'test_f1': float(f1_score(y_test, y_test_pred, zero_division=0)),
+                'train_accuracy': float(np.mean(y_train_pred == y_train)),
+                'test_accuracy': report['accuracy'],
+                'test_precision': report['1']['precision'],
+                'test_recall': report['1']['recall'],
+                'test_f1': report['1']['f1-score'],
                 'test_roc_auc': float(roc_auc_score(y_test, y_test_proba)),
-                'confusion_matrix': confusion_matrix(y_test, y_test_pred).tolist(),
-                'classification_report': classification_report(y_test, y_test_pred, output_dict=True),
+                'confusion_matrix': cm.tolist(),
+                'classification_report': report,
                 'trained_at': training_end.isoformat(),
                 'model_params': MODEL_PARAMS,
+                'best_iteration': best_iteration,
+                'n_estimators': best_iteration + 1,
                 'feature_columns': self.feature_columns
             }
             
@@ -149,6 +207,37 @@ class ModelTrainer:
             logger.error(f"Model training failed: {e}")
             raise
     
+    @staticmethod
+    def _classification_report_from_confusion(cm: np.ndarray) -> Dict[str, Any]:
+        """Build a binary classification report (sklearn output_dict layout) from a 2x2 confusion matrix"""
+        def safe_div(numerator, denominator):
+            return float(numerator / denominator) if denominator else 0.0
+        
+        tn, fp, fn, tp = cm.ravel()
+        total = cm.sum()
+        
+        report = {}
+        for label, (hits, false_pos, false_neg) in (('0', (tn, fn, fp)), ('1', (tp, fp, fn))):
+            precision = safe_div(hits, hits + false_pos)
+            recall = safe_div(hits, hits + false_neg)
+            report[label] = {
+                'precision': precision,
+                'recall': recall,
+                'f1-score': safe_div(2 * precision * recall, precision + recall),
+                'support': float(hits + false_neg)
+            }
+        
+        report['accuracy'] = safe_div(tp + tn, total)
+        for average, weights in (('macro avg', (0.5, 0.5)),
+                                 ('weighted avg', (safe_div(tn + fp, total), safe_div(tp + fn, total)))):
+            report[average] = {
+                metric: weights[0] * report['0'][metric] + weights[1] * report['1'][metric]
+                for metric in ('precision', 'recall', 'f1-score')
+            }
+            report[average]['support'] = float(total)
+        
+        return report
+    
     def save_model(self, model_path: str = "churn_model.joblib", metrics_path: str = "churn_model_metrics.json") -> bool:
         """Save the trained model and metrics"""
         try:
@@ -185,23 +274,26 @@ class ModelTrainer:
             'issues': []
         }
         
-        # Check missing values
+        # Check missing values and value ranges with one vectorized pass per statistic
+        present_columns = [column for column in self.feature_columns if column in df.columns]
         for column in self.feature_columns:
-            if column in df.columns:
-                missing_count = df[column].isnull().sum()
-                quality_report['missing_values'][column] = int(missing_count)
-                quality_report['data_types'][column] = str(df[column].dtype)
-                
-                if df[column].dtype in ['int64', 'float64']:
-                    quality_report['value_ranges'][column] = {
-                        'min': float(df[column].min()),
-                        'max': float(df[column].max()),
-                        'mean': float(df[column].mean()),
-                        'std': float(df[column].std())
-                    }
-            else:
+            if column not in df.columns:
                 quality_report['issues'].append(f"Missing feature column: {column}")
         
+        feature_df = df[present_columns]
+        missing_counts = feature_df.isna().sum()
+        numeric_columns = [column for column in present_columns if feature_df[column].dtype in ['int64', 'float64']]
+        stats = feature_df[numeric_columns].agg(['min', 'max', 'mean', 'std'])
+        
+        for column in present_columns:
+            quality_report['missing_values'][column] = int(missing_counts[column])
+            quality_report['data_types'][column] = str(feature_df[column].dtype)
+        
+        for column in numeric_columns:
+            quality_report['value_ranges'][column] = {
+                stat: float(stats.at[stat, column]) for stat in ('min', 'max', 'mean', 'std')
+            }
+        
         # Check class distribution
         if 'churn_label' in df.columns:
             class_counts = df['churn_label'].value_counts().to_dict()
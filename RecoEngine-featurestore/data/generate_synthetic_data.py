@@ -1,13 +1,22 @@
 import json
-import random
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
+import asyncio
+import aiohttp
+import orjson
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"
 NUM_USERS = 100
+MAX_CONCURRENT_USERS = 32  # Users whose feature batches are in flight at once
+MAX_CONNECTIONS = 64  # Connection pool size shared by all requests
+MAX_RETRIES = 3  # Retries per request when the API signals overload
+RETRY_STATUSES = {429, 503}
+RETRY_BACKOFF = 0.2  # Initial backoff in seconds, doubled on each retry
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Single PCG64 generator; all draws are made up front in vectorized batches
+RNG = np.random.default_rng()
 
 # Sample data pools
 LOYALTY_TIERS = ["bronze", "silver", "gold", "platinum"]
@@ -17,235 +26,257 @@ PAYMENT_METHODS = ["credit_card", "paypal", "apple_pay", "google_pay"]
 LANGUAGES = ["en", "es", "fr", "de", "it"]
 SUBSCRIPTION_STATUS = ["active", "expired", "cancelled", "pending"]
 
-def generate_user_profile_features(user_id):
+def draw_feature_values(num_users):
+    """Draw every random feature value for all users up front, one vectorized call per field"""
+    n = num_users
+    
+    # Create correlated behavior patterns
+    is_active_user = RNG.random(n) > 0.3  # 70% active users
+    is_high_value = RNG.random(n) > 0.8  # 20% high-value customers
+    engagement_level = RNG.integers(0, 3, n)  # 0=low, 1=medium, 2=high
+    has_issues = RNG.random(n) > 0.7  # 30% of users have support issues
+    is_engaged_session = RNG.random(n) > 0.4  # 60% engaged sessions
+    
+    draws = {
+        # Profile
+        "account_age_days": RNG.integers(30, 1001, n),
+        "membership_duration": RNG.integers(1, 37, n),
+        "loyalty_tier": RNG.choice(LOYALTY_TIERS, n),
+        "geo_location": RNG.choice(GEO_LOCATIONS, n),
+        "device_type": RNG.choice(DEVICE_TYPES, n),
+        "preferred_payment_method": RNG.choice(PAYMENT_METHODS, n),
+        "language_preference": RNG.choice(LANGUAGES, n),
+        
+        # Behavior
+        "days_since_last_login": np.where(is_active_user, RNG.integers(0, 4, n), RNG.integers(7, 31, n)),
+        "days_since_last_purchase": np.where(is_active_user, RNG.integers(0, 15, n), RNG.integers(30, 91, n)),
+        "sessions_last_7days": np.where(is_active_user, RNG.integers(5, 16, n), RNG.integers(0, 4, n)),
+        "sessions_last_30days": np.where(is_active_user, RNG.integers(15, 51, n), RNG.integers(0, 11, n)),
+        "avg_session_duration_last_30days": RNG.uniform(2.0, 45.0, n),
+        "click_through_rate_last_10_sessions": RNG.uniform(0.05, 0.25, n),
+        "cart_abandonment_rate": RNG.uniform(0.1, 0.8, n),
+        "wishlist_adds_vs_purchases": RNG.uniform(0.1, 2.0, n),
+        "content_engagement_rate": RNG.uniform(0.1, 0.6, n),
+        
+        # Transactional
+        "avg_order_value": np.round(np.where(is_high_value, RNG.uniform(100, 500, n), RNG.uniform(20, 100, n)), 2),
+        "total_orders_last_6months": np.where(is_high_value, RNG.integers(10, 51, n), RNG.integers(0, 16, n)),
+        "purchase_frequency_last_90days": np.round(
+            np.where(is_high_value, RNG.uniform(0.1, 0.3, n), RNG.uniform(0.01, 0.1, n)), 3),
+        "time_since_last_high_value_purchase": RNG.integers(0, 181, n),
+        "refund_rate": RNG.uniform(0.0, 0.15, n),
+        "subscription_payment_status": RNG.choice(SUBSCRIPTION_STATUS, n),
+        "discount_dependency_score": RNG.uniform(0.1, 0.9, n),
+        "spend_electronics": RNG.uniform(0.1, 0.4, n),
+        "spend_clothing": RNG.uniform(0.1, 0.3, n),
+        "spend_books": RNG.uniform(0.05, 0.2, n),
+        "spend_home": RNG.uniform(0.1, 0.25, n),
+        
+        # Engagement: per-level (low, medium, high) uniform ranges
+        "push_notification_open_rate": np.round(
+            RNG.uniform(np.array([0.0, 0.2, 0.4])[engagement_level], np.array([0.2, 0.4, 0.8])[engagement_level]), 3),
+        "email_click_rate": np.round(
+            RNG.uniform(np.array([0.0, 0.1, 0.3])[engagement_level], np.array([0.1, 0.3, 0.6])[engagement_level]), 3),
+        "in_app_offer_click_rate": np.round(
+            RNG.uniform(np.array([0.0, 0.1, 0.2])[engagement_level], np.array([0.1, 0.2, 0.5])[engagement_level]), 3),
+        "response_time_to_promotions": RNG.uniform(0.5, 24.0, n),
+        "recent_retention_offer_response": RNG.choice(np.array(["accepted", "declined", "ignored", None], dtype=object), n),
+        
+        # Support
+        "support_tickets_last_90days": np.where(has_issues, RNG.integers(1, 9, n), 0),
+        "avg_ticket_resolution_time": np.round(np.where(has_issues, RNG.uniform(2.0, 48.0, n), RNG.uniform(0.5, 4.0, n)), 1),
+        "csat_score_last_interaction": np.round(np.where(has_issues, RNG.uniform(2.0, 4.0, n), RNG.uniform(4.0, 5.0, n)), 1),
+        "refund_requests": np.where(has_issues, RNG.integers(0, 4, n), 0),
+        
+        # Real-time
+        "current_session_clicks": np.where(is_engaged_session, RNG.integers(1, 51, n), RNG.integers(0, 6, n)),
+        "time_spent_on_checkout_page": RNG.uniform(0.0, 300.0, n),
+        "added_to_cart_but_not_bought_flag": RNG.random(n) < 0.5,
+        "session_bounce_flag": ~is_engaged_session,
+    }
+    
+    # Plain Python values so payloads serialize without numpy types
+    return {name: values.tolist() for name, values in draws.items()}
+
+def generate_user_profile_features(user_id, draws, i):
     """Generate realistic user profile features"""
     return {
         "user_id": user_id,
-        "account_age_days": random.randint(30, 1000),
-        "membership_duration": random.randint(1, 36),
-        "loyalty_tier": random.choice(LOYALTY_TIERS),
-        "geo_location": random.choice(GEO_LOCATIONS),
-        "device_type": random.choice(DEVICE_TYPES),
-        "preferred_payment_method": random.choice(PAYMENT_METHODS),
-        "language_preference": random.choice(LANGUAGES)
+        "account_age_days": draws["account_age_days"][i],
+        "membership_duration": draws["membership_duration"][i],
+        "loyalty_tier": draws["loyalty_tier"][i],
+        "geo_location": draws["geo_location"][i],
+        "device_type": draws["device_type"][i],
+        "preferred_payment_method": draws["preferred_payment_method"][i],
+        "language_preference": draws["language_preference"][i]
     }
 
-def generate_user_behavior_features(user_id):
+def generate_user_behavior_features(user_id, draws, i):
     """Generate realistic user behavior features"""
-    # Create correlated behavior patterns
-    is_active_user = random.random() > 0.3  # 70% active users
-    
-    if is_active_user:
-        days_since_login = random.randint(0, 3)
-        days_since_purchase = random.randint(0, 14)
-        sessions_7days = random.randint(5, 15)
-        sessions_30days = random.randint(15, 50)
-    else:
-        days_since_login = random.randint(7, 30)
-        days_since_purchase = random.randint(30, 90)
-        sessions_7days = random.randint(0, 3)
-        sessions_30days = random.randint(0, 10)
-    
     return {
         "user_id": user_id,
-        "days_since_last_login": days_since_login,
-        "days_since_last_purchase": days_since_purchase,
-        "sessions_last_7days": sessions_7days,
-        "sessions_last_30days": sessions_30days,
-        "avg_session_duration_last_30days": random.uniform(2.0, 45.0),
-        "click_through_rate_last_10_sessions": random.uniform(0.05, 0.25),
-        "cart_abandonment_rate": random.uniform(0.1, 0.8),
-        "wishlist_adds_vs_purchases": random.uniform(0.1, 2.0),
-        "content_engagement_rate": random.uniform(0.1, 0.6)
+        "days_since_last_login": draws["days_since_last_login"][i],
+        "days_since_last_purchase": draws["days_since_last_purchase"][i],
+        "sessions_last_7days": draws["sessions_last_7days"][i],
+        "sessions_last_30days": draws["sessions_last_30days"][i],
+        "avg_session_duration_last_30days": draws["avg_session_duration_last_30days"][i],
+        "click_through_rate_last_10_sessions": draws["click_through_rate_last_10_sessions"][i],
+        "cart_abandonment_rate": draws["cart_abandonment_rate"][i],
+        "wishlist_adds_vs_purchases": draws["wishlist_adds_vs_purchases"][i],
+        "content_engagement_rate": draws["content_engagement_rate"][i]
     }
 
-def generate_transactional_features(user_id):
+def generate_transactional_features(user_id, draws, i):
     """Generate realistic transactional features"""
-    is_high_value = random.random() > 0.8  # 20% high-value customers
-    
-    if is_high_value:
-        avg_order_value = random.uniform(100, 500)
-        total_orders = random.randint(10, 50)
-        purchase_frequency = random.uniform(0.1, 0.3)
-    else:
-        avg_order_value = random.uniform(20, 100)
-        total_orders = random.randint(0, 15)
-        purchase_frequency = random.uniform(0.01, 0.1)
-    
     return {
         "user_id": user_id,
-        "avg_order_value": round(avg_order_value, 2),
-        "total_orders_last_6months": total_orders,
-        "purchase_frequency_last_90days": round(purchase_frequency, 3),
-        "time_since_last_high_value_purchase": random.randint(0, 180),
-        "refund_rate": random.uniform(0.0, 0.15),
-        "subscription_payment_status": random.choice(SUBSCRIPTION_STATUS),
-        "discount_dependency_score": random.uniform(0.1, 0.9),
+        "avg_order_value": draws["avg_order_value"][i],
+        "total_orders_last_6months": draws["total_orders_last_6months"][i],
+        "purchase_frequency_last_90days": draws["purchase_frequency_last_90days"][i],
+        "time_since_last_high_value_purchase": draws["time_since_last_high_value_purchase"][i],
+        "refund_rate": draws["refund_rate"][i],
+        "subscription_payment_status": draws["subscription_payment_status"][i],
+        "discount_dependency_score": draws["discount_dependency_score"][i],
         "category_spend_distribution": {
-            "electronics": random.uniform(0.1, 0.4),
-            "clothing": random.uniform(0.1, 0.3),
-            "books": random.uniform(0.05, 0.2),
-            "home": random.uniform(0.1, 0.25)
+            "electronics": draws["spend_electronics"][i],
+            "clothing": draws["spend_clothing"][i],
+            "books": draws["spend_books"][i],
+            "home": draws["spend_home"][i]
         }
     }
 
-def generate_engagement_features(user_id):
+def generate_engagement_features(user_id, draws, i):
     """Generate realistic engagement features"""
-    engagement_level = random.choice(["low", "medium", "high"])
-    
-    if engagement_level == "high":
-        push_open_rate = random.uniform(0.4, 0.8)
-        email_click_rate = random.uniform(0.3, 0.6)
-        offer_click_rate = random.uniform(0.2, 0.5)
-    elif engagement_level == "medium":
-        push_open_rate = random.uniform(0.2, 0.4)
-        email_click_rate = random.uniform(0.1, 0.3)
-        offer_click_rate = random.uniform(0.1, 0.2)
-    else:
-        push_open_rate = random.uniform(0.0, 0.2)
-        email_click_rate = random.uniform(0.0, 0.1)
-        offer_click_rate = random.uniform(0.0, 0.1)
-    
     return {
         "user_id": user_id,
-        "push_notification_open_rate": round(push_open_rate, 3),
-        "email_click_rate": round(email_click_rate, 3),
-        "in_app_offer_click_rate": round(offer_click_rate, 3),
-        "response_time_to_promotions": random.uniform(0.5, 24.0),
-        "recent_retention_offer_response": random.choice(["accepted", "declined", "ignored", None])
+        "push_notification_open_rate": draws["push_notification_open_rate"][i],
+        "email_click_rate": draws["email_click_rate"][i],
+        "in_app_offer_click_rate": draws["in_app_offer_click_rate"][i],
+        "response_time_to_promotions": draws["response_time_to_promotions"][i],
+        "recent_retention_offer_response": draws["recent_retention_offer_response"][i]
     }
 
-def generate_support_features(user_id):
+def generate_support_features(user_id, draws, i):
     """Generate realistic support features"""
-    has_issues = random.random() > 0.7  # 30% of users have support issues
-    
-    if has_issues:
-        tickets = random.randint(1, 8)
-        resolution_time = random.uniform(2.0, 48.0)
-        csat_score = random.uniform(2.0, 4.0)
-        refund_requests = random.randint(0, 3)
-    else:
-        tickets = 0
-        resolution_time = random.uniform(0.5, 4.0)
-        csat_score = random.uniform(4.0, 5.0)
-        refund_requests = 0
-    
     return {
         "user_id": user_id,
-        "support_tickets_last_90days": tickets,
-        "avg_ticket_resolution_time": round(resolution_time, 1),
-        "csat_score_last_interaction": round(csat_score, 1),
-        "refund_requests": refund_requests
+        "support_tickets_last_90days": draws["support_tickets_last_90days"][i],
+        "avg_ticket_resolution_time": draws["avg_ticket_resolution_time"][i],
+        "csat_score_last_interaction": draws["csat_score_last_interaction"][i],
+        "refund_requests": draws["refund_requests"][i]
     }
 
-def generate_realtime_features(user_id):
+def generate_realtime_features(user_id, draws, i):
     """Generate realistic real-time session features"""
-    is_engaged_session = random.random() > 0.4  # 60% engaged sessions
-    
     return {
         "user_id": user_id,
-        "current_session_clicks": random.randint(1, 50) if is_engaged_session else random.randint(0, 5),
-        "time_spent_on_checkout_page": random.uniform(0.0, 300.0),
-        "added_to_cart_but_not_bought_flag": random.choice([True, False]),
-        "session_bounce_flag": not is_engaged_session
+        "current_session_clicks": draws["current_session_clicks"][i],
+        "time_spent_on_checkout_page": draws["time_spent_on_checkout_page"][i],
+        "added_to_cart_but_not_bought_flag": draws["added_to_cart_but_not_bought_flag"][i],
+        "session_bounce_flag": draws["session_bounce_flag"][i]
     }
 
-def ingest_features_to_api(features, endpoint):
-    """Send features to the API"""
+async def ingest_features_to_api(session, features, endpoint):
+    """Send features to the API, backing off when the server pushes back"""
     try:
-        response = requests.post(f"{API_BASE_URL}/{endpoint}", json=features)
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"Error ingesting {endpoint} for user {features['user_id']}: {response.text}")
-            return False
+        body = orjson.dumps(features)
+        for attempt in range(MAX_RETRIES + 1):
+            async with session.post(f"{API_BASE_URL}/{endpoint}", data=body, headers=JSON_HEADERS) as response:
+                if response.status == 200:
+                    return True
+                if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    print(f"Error ingesting {endpoint} for user {features['user_id']}: {await response.text()}")
+                    return False
+                retry_after = response.headers.get("Retry-After", "")
+            
+            # Honor Retry-After when the server sends it, otherwise back off exponentially
+            delay = float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * (2 ** attempt)
+            await asyncio.sleep(delay)
     except Exception as e:
         print(f"Failed to ingest {endpoint} for user {features['user_id']}: {str(e)}")
         return False
 
-def generate_and_ingest_user_data(user_id):
+async def generate_and_ingest_user_data(session, user_id, draws, i):
     """Generate and ingest all feature types for a user"""
     print(f"Generating data for user {user_id}...")
     
-    # Generate all feature types
-    profile_features = generate_user_profile_features(user_id)
-    behavior_features = generate_user_behavior_features(user_id)
-    transactional_features = generate_transactional_features(user_id)
-    engagement_features = generate_engagement_features(user_id)
-    support_features = generate_support_features(user_id)
-    realtime_features = generate_realtime_features(user_id)
-    
-    # Ingest to API
-    success_count = 0
-    
-    if ingest_features_to_api(profile_features, "ingest/profile"):
-        success_count += 1
-    
-    if ingest_features_to_api(behavior_features, "ingest/behavior"):
-        success_count += 1
+    # Generate all feature types from the user's row of precomputed draws
+    payloads = [
+        (generate_user_profile_features(user_id, draws, i), "ingest/profile"),
+        (generate_user_behavior_features(user_id, draws, i), "ingest/behavior"),
+        (generate_transactional_features(user_id, draws, i), "ingest/transactional"),
+        (generate_engagement_features(user_id, draws, i), "ingest/engagement"),
+        (generate_support_features(user_id, draws, i), "ingest/support"),
+        (generate_realtime_features(user_id, draws, i), "ingest/realtime"),
+    ]
     
-    if ingest_features_to_api(transactional_features, "ingest/transactional"):
-        success_count += 1
+    # Ingest to API, all feature types concurrently
+    results = await asyncio.gather(
+        *[ingest_features_to_api(session, features, endpoint) for features, endpoint in payloads]
+    )
     
-    if ingest_features_to_api(engagement_features, "ingest/engagement"):
-        success_count += 1
-    
-    if ingest_features_to_api(support_features, "ingest/support"):
-        success_count += 1
-    
-    if ingest_features_to_api(realtime_features, "ingest/realtime"):
-        success_count += 1
-    
-    return success_count == 6
+    return all(results)
 
-def test_prediction_api(user_id):
+async def test_prediction_api(session, user_id):
     """Test the prediction API for a user"""
     try:
-        response = requests.post(f"{API_BASE_URL}/predict/{user_id}")
-        if response.status_code == 200:
-            prediction = response.json()
-            print(f"Prediction for user {user_id}:")
-            print(f"  Churn Probability: {prediction['churn_probability']}")
-            print(f"  Risk Segment: {prediction['risk_segment']}")
-            print(f"  Churn Reasons: {prediction['churn_reasons']}")
-            return True
-        else:
-            print(f"Prediction failed for user {user_id}: {response.text}")
-            return False
+        async with session.post(f"{API_BASE_URL}/predict/{user_id}") as response:
+            if response.status == 200:
+                prediction = orjson.loads(await response.read())
+                print(f"Prediction for user {user_id}:")
+                print(f"  Churn Probability: {prediction['churn_probability']}")
+                print(f"  Risk Segment: {prediction['risk_segment']}")
+                print(f"  Churn Reasons: {prediction['churn_reasons']}")
+                return True
+            else:
+                print(f"Prediction failed for user {user_id}: {await response.text()}")
+                return False
     except Exception as e:
         print(f"Failed to get prediction for user {user_id}: {str(e)}")
         return False
 
-def main():
-    """Main function to generate synthetic data"""
+async def process_user(session, semaphore, draws, i):
+    """Ingest one user's data, bounded by the shared semaphore"""
+    user_id = f"user_{i:04d}"
+    
+    async with semaphore:
+        return await generate_and_ingest_user_data(session, user_id, draws, i - 1)
+
+async def main_async():
+    """Generate and ingest synthetic data for all users concurrently"""
     print(f"Generating synthetic data for {NUM_USERS} users...")
     print(f"API Base URL: {API_BASE_URL}")
     
-    successful_users = 0
+    # The semaphore caps users in flight and provides backpressure on the API
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_USERS)
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, keepalive_timeout=30)
+    
+    draws = draw_feature_values(NUM_USERS)
     
-    for i in range(1, NUM_USERS + 1):
-        user_id = f"user_{i:04d}"
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await asyncio.gather(
+            *[process_user(session, semaphore, draws, i) for i in range(1, NUM_USERS + 1)]
+        )
+        successful_users = sum(results)
         
-        if generate_and_ingest_user_data(user_id):
-            successful_users += 1
-            
-            # Test prediction for every 10th user
-            if i % 10 == 0:
-                print(f"\nTesting prediction for {user_id}...")
-                test_prediction_api(user_id)
-                print()
+        print(f"\nData generation completed!")
+        print(f"Successfully processed {successful_users}/{NUM_USERS} users")
         
-        # Small delay to avoid overwhelming the API
-        time.sleep(0.1)
-    
-    print(f"\nData generation completed!")
-    print(f"Successfully processed {successful_users}/{NUM_USERS} users")
-    
-    # Test a few predictions
-    print("\nTesting predictions for sample users...")
-    for user_id in ["user_0001", "user_0025", "user_0050", "user_0075", "user_0100"]:
-        test_prediction_api(user_id)
-        print()
+        # Test prediction for every 10th successfully ingested user, off the ingestion path
+        sample_ids = [f"user_{i:04d}" for i, success in enumerate(results, start=1) if success and i % 10 == 0]
+        print(f"\nTesting predictions for {len(sample_ids)} ingested users...")
+        await asyncio.gather(*[test_prediction_api(session, user_id) for user_id in sample_ids])
+        
+        # Test a few predictions
+        print("\nTesting predictions for sample users...")
+        await asyncio.gather(*[
+            test_prediction_api(session, user_id)
+            for user_id in ["user_0001", "user_0025", "user_0050", "user_0075", "user_0100"]
+        ])
+
+def main():
+    """Main function to generate synthetic data"""
+    asyncio.run(main_async())
 
 if __name__ == "__main__":
     main()
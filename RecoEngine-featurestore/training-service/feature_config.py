@@ -50,6 +50,8 @@ MODEL_PARAMS = {
     'n_estimators': 100,
     'max_depth': 6,
     'learning_rate': 0.1,
+    'tree_method': 'hist',
+    'n_jobs': -1,
     'random_state': 42
 }
 
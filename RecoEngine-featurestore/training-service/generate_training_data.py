@@ -7,6 +7,8 @@ in the 'churn_features' namespace under the 'training_data' set.
 """
 
 import aerospike
+from aerospike_helpers.batch.records import BatchRecords, Write
+from aerospike_helpers.operations import operations
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -15,6 +17,7 @@ import logging
 import argparse
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add the api-service directory to path to import feature_config
 sys.path.append(os.path.join(os.path.dirname(__file__), 'api-service'))
@@ -30,6 +33,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Feature columns of the generated float32 matrix, in order
+FEATURE_ORDER = (
+    'acc_age_days', 'member_dur', 'loyalty_enc', 'geo_loc_enc', 'device_type_enc',
+    'pref_pay_enc', 'lang_pref_enc', 'sub_pay_enc', 'retention_enc',
+    'days_last_login', 'days_last_purch', 'sess_7d', 'sess_30d', 'avg_sess_dur',
+    'ctr_10_sess', 'cart_abandon', 'wishlist_ratio', 'content_engage',
+    'avg_order_val', 'orders_6m', 'purch_freq_90d', 'last_hv_purch', 'refund_rate',
+    'discount_dep', 'push_open_rate', 'email_ctr', 'inapp_ctr', 'promo_resp_time',
+    'tickets_90d', 'avg_ticket_res', 'csat_score', 'refund_req',
+    'curr_sess_clk', 'checkout_time', 'cart_no_buy', 'bounce_flag'
+)
+
+# Aerospike bin names of a training record: metadata bins followed by the feature columns
+BIN_NAMES = ('user_id', 'churn_label', 'generated_at', 'data_type', *FEATURE_ORDER)
+
+# Inverse CDFs for encoded categorical features: (first code, cumulative probabilities)
+CATEGORICAL_CDFS = {
+    'loyalty_enc': (1, np.cumsum([0.4, 0.3, 0.2, 0.1])),
+    'geo_loc_enc': (1, np.cumsum([0.3, 0.25, 0.2, 0.15, 0.1])),
+    'device_type_enc': (1, np.cumsum([0.6, 0.3, 0.1])),
+    'pref_pay_enc': (1, np.cumsum([0.5, 0.3, 0.15, 0.05])),
+    'lang_pref_enc': (1, np.cumsum([0.7, 0.15, 0.1, 0.05])),
+    'sub_pay_enc': (1, np.cumsum([0.7, 0.2, 0.1])),
+    'retention_enc': (1, np.cumsum([0.4, 0.3, 0.3])),
+    'csat_score': (1, np.cumsum([0.05, 0.1, 0.2, 0.4, 0.25])),
+    'bounce_flag': (0, np.cumsum([0.7, 0.3])),
+}
+
+# Records sent per batch_write request, and batches kept in flight concurrently
+BATCH_WRITE_SIZE = 256
+WRITER_THREADS = 16
+
 class TrainingDataGenerator:
     def __init__(self, aerospike_host="localhost", aerospike_port=3000):
         self.aerospike_host = aerospike_host
@@ -62,139 +97,131 @@ class TrainingDataGenerator:
             logger.info("Disconnected from Aerospike")
     
     def generate_synthetic_features(self, n_samples=1000, random_seed=42):
-        """Generate synthetic training features"""
+        """Generate synthetic training features
+        
+        Returns a column-oriented batch: ``features`` is an ``(n_samples, len(FEATURE_ORDER))``
+        float32 matrix, with ``user_ids`` and ``churn_labels`` as parallel per-sample arrays
+        and ``generated_at`` as a single batch timestamp. No per-record dicts are built: on insert,
+        each matrix row is zipped with ``BIN_NAMES`` straight into ``operations.write`` calls.
+        """
         logger.info(f"Generating {n_samples} synthetic training samples")
         
-        np.random.seed(random_seed)
+        rng = np.random.default_rng(random_seed)
         
-        training_data = []
+        # Draw every feature as a whole column into one contiguous float32 matrix
+        columns = self._draw_feature_columns(rng, n_samples)
+        features = np.empty((n_samples, len(FEATURE_ORDER)), dtype=np.float32)
+        for j, feature_name in enumerate(FEATURE_ORDER):
+            features[:, j] = columns[feature_name]
         
-        for i in range(n_samples):
-            # Generate base user ID
-            user_id = f"synthetic_user_{uuid.uuid4().hex[:8]}"
-            
-            # Generate realistic feature values
-            features = {}
-            
-            # Account and membership features
-            features['acc_age_days'] = np.random.exponential(365) + 30  # 30+ days, exponential distribution
-            features['member_dur'] = features['acc_age_days'] * np.random.uniform(0.5, 1.0)  # Member duration <= account age
-            
-            # Categorical features (encoded)
-            features['loyalty_enc'] = np.random.choice([1, 2, 3, 4], p=[0.4, 0.3, 0.2, 0.1])  # Bronze most common
-            features['geo_loc_enc'] = np.random.choice([1, 2, 3, 4, 5], p=[0.3, 0.25, 0.2, 0.15, 0.1])
-            features['device_type_enc'] = np.random.choice([1, 2, 3], p=[0.6, 0.3, 0.1])  # Mobile most common
-            features['pref_pay_enc'] = np.random.choice([1, 2, 3, 4], p=[0.5, 0.3, 0.15, 0.05])
-            features['lang_pref_enc'] = np.random.choice([1, 2, 3, 4], p=[0.7, 0.15, 0.1, 0.05])
-            features['sub_pay_enc'] = np.random.choice([1, 2, 3], p=[0.7, 0.2, 0.1])
-            features['retention_enc'] = np.random.choice([1, 2, 3], p=[0.4, 0.3, 0.3])
-            
-            # Activity features
-            features['days_last_login'] = np.random.exponential(5)  # Most users login frequently
-            features['days_last_purch'] = np.random.exponential(15) + features['days_last_login']  # Purchase after login
-            features['sess_7d'] = max(0, np.random.poisson(5))  # Sessions in last 7 days
-            features['sess_30d'] = features['sess_7d'] + max(0, np.random.poisson(15))  # Sessions in last 30 days
-            features['avg_sess_dur'] = np.random.lognormal(3, 0.5)  # Average session duration in minutes
-            
-            # Engagement features
-            features['ctr_10_sess'] = np.random.beta(2, 8)  # Click-through rate (0-1)
-            features['cart_abandon'] = np.random.beta(3, 7)  # Cart abandonment rate (0-1)
-            features['wishlist_ratio'] = np.random.beta(2, 8)  # Wishlist to purchase ratio
-            features['content_engage'] = np.random.beta(3, 7)  # Content engagement score
-            
-            # Purchase behavior features
-            features['avg_order_val'] = np.random.lognormal(4, 0.8) + 10  # Average order value
-            features['orders_6m'] = max(0, np.random.poisson(3))  # Orders in last 6 months
-            features['purch_freq_90d'] = max(0, np.random.poisson(2))  # Purchase frequency in 90 days
-            features['last_hv_purch'] = features['days_last_purch'] + np.random.exponential(30)  # Days since last high-value purchase
-            features['refund_rate'] = np.random.beta(1, 9)  # Refund rate (0-1)
-            
-            # Marketing features
-            features['discount_dep'] = np.random.beta(2, 5)  # Discount dependency
-            features['push_open_rate'] = np.random.beta(3, 7)  # Push notification open rate
-            features['email_ctr'] = np.random.beta(2, 8)  # Email click-through rate
-            features['inapp_ctr'] = np.random.beta(3, 7)  # In-app click-through rate
-            features['promo_resp_time'] = np.random.exponential(24)  # Promo response time in hours
-            
-            # Support features
-            features['tickets_90d'] = max(0, np.random.poisson(1))  # Support tickets in 90 days
-            features['avg_ticket_res'] = np.random.exponential(48) + 2  # Average ticket resolution time in hours
-            features['csat_score'] = np.random.choice([1, 2, 3, 4, 5], p=[0.05, 0.1, 0.2, 0.4, 0.25])  # Customer satisfaction
-            features['refund_req'] = max(0, np.random.poisson(0.5))  # Number of refund requests
-            
-            # Session behavior features
-            features['curr_sess_clk'] = max(0, np.random.poisson(10))  # Clicks in current session
-            features['checkout_time'] = np.random.exponential(300) + 60  # Checkout time in seconds
-            features['cart_no_buy'] = max(0, np.random.poisson(2))  # Cart additions without purchase
-            features['bounce_flag'] = np.random.choice([0, 1], p=[0.7, 0.3])  # Bounce flag
-            
-            # Generate churn label based on realistic patterns
-            churn_probability = self._calculate_churn_probability(features)
-            churn_label = np.random.binomial(1, churn_probability)
-            
-            # Create training record (only store features and label, not the intermediate probability)
-            training_record = {
-                'user_id': user_id,
-                'features': features,
-                'churn_label': int(churn_label),
-                'generated_at': datetime.utcnow().isoformat(),
-                'data_type': 'synthetic_training'
-            }
-            
-            training_data.append(training_record)
-            
-            if (i + 1) % 100 == 0:
-                logger.info(f"Generated {i + 1}/{n_samples} samples")
+        # Generate churn labels based on realistic patterns
+        churn_probability = self._calculate_churn_probability(dict(zip(FEATURE_ORDER, features.T)))
+        churn_labels = rng.binomial(1, churn_probability)
+        
+        training_data = {
+            'user_ids': [f"synthetic_user_{uuid.uuid4().hex[:8]}" for _ in range(n_samples)],
+            'features': features,
+            'churn_labels': churn_labels,
+            'generated_at': datetime.utcnow().isoformat(),  # One timestamp shared by the whole batch
+            'data_type': 'synthetic_training'
+        }
         
-        logger.info(f"Generated {len(training_data)} synthetic training samples")
+        logger.info(f"Generated {n_samples} synthetic training samples")
         return training_data
     
+    def _draw_feature_columns(self, rng, n):
+        """Draw n realistic values for every feature as column arrays"""
+        features = {}
+        
+        # Account and membership features
+        features['acc_age_days'] = rng.exponential(365, n) + 30  # 30+ days, exponential distribution
+        features['member_dur'] = features['acc_age_days'] * rng.uniform(0.5, 1.0, n)  # Member duration <= account age
+        
+        # Categorical features (encoded)
+        features['loyalty_enc'] = self._draw_categorical(rng, 'loyalty_enc', n)  # Bronze most common
+        features['geo_loc_enc'] = self._draw_categorical(rng, 'geo_loc_enc', n)
+        features['device_type_enc'] = self._draw_categorical(rng, 'device_type_enc', n)  # Mobile most common
+        features['pref_pay_enc'] = self._draw_categorical(rng, 'pref_pay_enc', n)
+        features['lang_pref_enc'] = self._draw_categorical(rng, 'lang_pref_enc', n)
+        features['sub_pay_enc'] = self._draw_categorical(rng, 'sub_pay_enc', n)
+        features['retention_enc'] = self._draw_categorical(rng, 'retention_enc', n)
+        
+        # Activity features
+        features['days_last_login'] = rng.exponential(5, n)  # Most users login frequently
+        features['days_last_purch'] = rng.exponential(15, n) + features['days_last_login']  # Purchase after login
+        features['sess_7d'] = rng.poisson(5, n)  # Sessions in last 7 days
+        features['sess_30d'] = features['sess_7d'] + rng.poisson(15, n)  # Sessions in last 30 days
+        features['avg_sess_dur'] = rng.lognormal(3, 0.5, n)  # Average session duration in minutes
+        
+        # Engagement features
+        features['ctr_10_sess'] = rng.beta(2, 8, n)  # Click-through rate (0-1)
+        features['cart_abandon'] = rng.beta(3, 7, n)  # Cart abandonment rate (0-1)
+        features['wishlist_ratio'] = rng.beta(2, 8, n)  # Wishlist to purchase ratio
+        features['content_engage'] = rng.beta(3, 7, n)  # Content engagement score
+        
+        # Purchase behavior features
+        features['avg_order_val'] = rng.lognormal(4, 0.8, n) + 10  # Average order value
+        features['orders_6m'] = rng.poisson(3, n)  # Orders in last 6 months
+        features['purch_freq_90d'] = rng.poisson(2, n)  # Purchase frequency in 90 days
+        features['last_hv_purch'] = features['days_last_purch'] + rng.exponential(30, n)  # Days since last high-value purchase
+        features['refund_rate'] = rng.beta(1, 9, n)  # Refund rate (0-1)
+        
+        # Marketing features
+        features['discount_dep'] = rng.beta(2, 5, n)  # Discount dependency
+        features['push_open_rate'] = rng.beta(3, 7, n)  # Push notification open rate
+        features['email_ctr'] = rng.beta(2, 8, n)  # Email click-through rate
+        features['inapp_ctr'] = rng.beta(3, 7, n)  # In-app click-through rate
+        features['promo_resp_time'] = rng.exponential(24, n)  # Promo response time in hours
+        
+        # Support features
+        features['tickets_90d'] = rng.poisson(1, n)  # Support tickets in 90 days
+        features['avg_ticket_res'] = rng.exponential(48, n) + 2  # Average ticket resolution time in hours
+        features['csat_score'] = self._draw_categorical(rng, 'csat_score', n)  # Customer satisfaction
+        features['refund_req'] = rng.poisson(0.5, n)  # Number of refund requests
+        
+        # Session behavior features
+        features['curr_sess_clk'] = rng.poisson(10, n)  # Clicks in current session
+        features['checkout_time'] = rng.exponential(300, n) + 60  # Checkout time in seconds
+        features['cart_no_buy'] = rng.poisson(2, n)  # Cart additions without purchase
+        features['bounce_flag'] = self._draw_categorical(rng, 'bounce_flag', n)  # Bounce flag
+        
+        return features
+    
+    def _draw_categorical(self, rng, feature_name, n):
+        """Draw n category codes by inverting the feature's precomputed CDF"""
+        first_code, cdf = CATEGORICAL_CDFS[feature_name]
+        # Scale by the last entry so float rounding in the cumsum can't overshoot the final bucket
+        return np.searchsorted(cdf, rng.random(n) * cdf[-1], side='right') + first_code
+    
     def _calculate_churn_probability(self, features):
-        """Calculate realistic churn probability based on feature values"""
+        """Calculate realistic churn probabilities for feature columns
+        
+        Rules are boolean masks over the column arrays, so the whole batch is
+        scored in a handful of vector operations.
+        """
+        days_last_login = features['days_last_login']
+        days_last_purch = features['days_last_purch']
+        
         # Start with base probability
-        churn_prob = 0.2
+        churn_prob = np.full(len(days_last_login), 0.2)
         
         # High-risk factors (increase churn probability)
-        if features['days_last_login'] > 14:
-            churn_prob += 0.3
-        elif features['days_last_login'] > 7:
-            churn_prob += 0.15
-            
-        if features['days_last_purch'] > 60:
-            churn_prob += 0.25
-        elif features['days_last_purch'] > 30:
-            churn_prob += 0.1
-            
-        if features['cart_abandon'] > 0.7:
-            churn_prob += 0.2
-            
-        if features['sess_7d'] < 1:
-            churn_prob += 0.2
-            
-        if features['csat_score'] < 3:
-            churn_prob += 0.3
-            
-        if features['refund_rate'] > 0.3:
-            churn_prob += 0.15
-            
-        if features['tickets_90d'] > 3:
-            churn_prob += 0.1
+        churn_prob += np.where(days_last_login > 14, 0.3, np.where(days_last_login > 7, 0.15, 0.0))
+        churn_prob += np.where(days_last_purch > 60, 0.25, np.where(days_last_purch > 30, 0.1, 0.0))
+        churn_prob += 0.2 * (features['cart_abandon'] > 0.7)
+        churn_prob += 0.2 * (features['sess_7d'] < 1)
+        churn_prob += 0.3 * (features['csat_score'] < 3)
+        churn_prob += 0.15 * (features['refund_rate'] > 0.3)
+        churn_prob += 0.1 * (features['tickets_90d'] > 3)
         
         # Protective factors (decrease churn probability)
-        if features['loyalty_enc'] >= 3:  # Gold/Platinum
-            churn_prob -= 0.1
-            
-        if features['orders_6m'] > 5:
-            churn_prob -= 0.15
-            
-        if features['avg_order_val'] > 100:
-            churn_prob -= 0.1
-            
-        if features['push_open_rate'] > 0.5:
-            churn_prob -= 0.05
+        churn_prob -= 0.1 * (features['loyalty_enc'] >= 3)  # Gold/Platinum
+        churn_prob -= 0.15 * (features['orders_6m'] > 5)
+        churn_prob -= 0.1 * (features['avg_order_val'] > 100)
+        churn_prob -= 0.05 * (features['push_open_rate'] > 0.5)
         
         # Ensure probability is between 0 and 1
-        return max(0.01, min(0.99, churn_prob))
+        return np.clip(churn_prob, 0.01, 0.99)
     
     def insert_training_data(self, training_data):
         """Insert training data into Aerospike"""
@@ -202,43 +229,72 @@ class TrainingDataGenerator:
             logger.error("Not connected to Aerospike")
             return False
         
-        logger.info(f"Inserting {len(training_data)} training records into Aerospike")
+        n_records = len(training_data['user_ids'])
+        logger.info(f"Inserting {n_records} training records into Aerospike")
         
         success_count = 0
         error_count = 0
+        inserted_count = 0
         
-        for i, record in enumerate(training_data):
-            try:
-                # Create Aerospike key
-                key = (self.namespace, self.set_name, record['user_id'])
-                
-                # Prepare bins (Aerospike record fields)
-                bins = {
-                    'user_id': record['user_id'],
-                    'churn_label': record['churn_label'],
-                    'generated_at': record['generated_at'],
-                    'data_type': record['data_type']
-                }
-                
-                # Add all features as separate bins
-                for feature_name, feature_value in record['features'].items():
-                    bins[feature_name] = float(feature_value)
-                
-                # Insert record
-                self.client.put(key, bins)
-                success_count += 1
-                
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Inserted {i + 1}/{len(training_data)} records")
-                    
-            except Exception as e:
-                logger.error(f"Failed to insert record {record['user_id']}: {e}")
-                error_count += 1
-                continue
+        # Send records in chunks so one batch request carries many writes, and keep
+        # several batches in flight; the client releases the GIL while waiting on I/O
+        with ThreadPoolExecutor(max_workers=WRITER_THREADS) as executor:
+            futures = [executor.submit(self._insert_batch, training_data, start, min(start + BATCH_WRITE_SIZE, n_records))
+                       for start in range(0, n_records, BATCH_WRITE_SIZE)]
+            for future in as_completed(futures):
+                batch_success, batch_errors = future.result()
+                success_count += batch_success
+                error_count += batch_errors
+                inserted_count += batch_success + batch_errors
+                logger.info(f"Inserted {inserted_count}/{n_records} records")
         
         logger.info(f"Training data insertion completed. Success: {success_count}, Errors: {error_count}")
         return success_count > 0
     
+    def _insert_batch(self, training_data, start, stop):
+        """Write records [start, stop) of the training batch with a single batch request"""
+        user_ids = training_data['user_ids']
+        generated_at = training_data['generated_at']
+        data_type = training_data['data_type']
+        
+        # Convert the whole slice to native Python values in one call each
+        feature_rows = training_data['features'][start:stop].tolist()
+        churn_labels = training_data['churn_labels'][start:stop].tolist()
+        writes = []
+        
+        write_policy = {'key': aerospike.POLICY_KEY_SEND}
+        
+        for i, row, churn_label in zip(range(start, stop), feature_rows, churn_labels):
+            # Create Aerospike key
+            key = (self.namespace, self.set_name, user_ids[i])
+            
+            # Bin values line up with the fixed BIN_NAMES schema, so write operations are
+            # built straight from the row without assembling an intermediate bins dict
+            bin_values = (user_ids[i], churn_label, generated_at, data_type, *row)
+            
+            writes.append(Write(
+                key,
+                [operations.write(bin_name, bin_value) for bin_name, bin_value in zip(BIN_NAMES, bin_values)],
+                policy=write_policy
+            ))
+        
+        success_count = 0
+        error_count = 0
+        try:
+            results = self.client.batch_write(BatchRecords(writes))
+        except Exception as e:
+            logger.error(f"Failed to insert batch of {stop - start} records starting at {user_ids[start]}: {e}")
+            return 0, stop - start
+        
+        for batch_record in results.batch_records:
+            if batch_record.result == 0:
+                success_count += 1
+            else:
+                logger.error(f"Failed to insert record {batch_record.key[2]}: status {batch_record.result}")
+                error_count += 1
+        
+        return success_count, error_count
+    
     def get_data_stats(self):
         """Get statistics about the training data in Aerospike"""
         if not self.client:
@@ -246,24 +302,26 @@ class TrainingDataGenerator:
             return None
         
         try:
-            # Scan the training data set
+            # Scan the training data set, projecting only the label bin
             scan = self.client.scan(self.namespace, self.set_name)
+            scan.select('churn_label')
             
             total_records = 0
             churn_count = 0
-            non_churn_count = 0
             
-            for record in scan.results():
+            # Stream records through a callback rather than materializing scan.results()
+            def count_record(input_tuple):
+                nonlocal total_records, churn_count
                 total_records += 1
-                if record[2].get('churn_label', 0) == 1:
+                if input_tuple[2].get('churn_label', 0) == 1:
                     churn_count += 1
-                else:
-                    non_churn_count += 1
+            
+            scan.foreach(count_record)
             
             stats = {
                 'total_records': total_records,
                 'churn_records': churn_count,
-                'non_churn_records': non_churn_count,
+                'non_churn_records': total_records - churn_count,
                 'churn_rate': churn_count / total_records if total_records > 0 else 0
             }
             
@@ -280,16 +338,28 @@ class TrainingDataGenerator:
             logger.error("Not connected to Aerospike")
             return False
         
+        logger.info("Clearing existing training data...")
+        
+        try:
+            # Truncate marks the whole set empty server-side in one request
+            self.client.truncate(self.namespace, self.set_name, 0)
+            logger.info("Truncated training data set")
+            return True
+        except Exception as e:
+            logger.warning(f"Truncate failed, falling back to scan and delete: {e}")
+        
         try:
-            logger.info("Clearing existing training data...")
             scan = self.client.scan(self.namespace, self.set_name)
             
             deleted_count = 0
-            for record in scan.results():
-                key = record[0]
-                self.client.remove(key)
+            
+            def delete_record(input_tuple):
+                nonlocal deleted_count
+                self.client.remove(input_tuple[0])
                 deleted_count += 1
             
+            scan.foreach(delete_record)
+            
             logger.info(f"Cleared {deleted_count} training records")
             return True
             